@@ -7,7 +7,7 @@ __version__ = "2.0.0"
 __author__ = "Adobe India Hackathon Team"
 
 from extractor import extract_outline
-from detector import HeuristicDetector
+from detector import HeuristicDetector, DEFAULT_DETECTOR
 from utils import (
     is_bold, is_italic, is_centered, is_top_of_page,
     clean_heading_text, calculate_text_stats
@@ -16,6 +16,7 @@ from utils import (
 __all__ = [
     'extract_outline',
     'HeuristicDetector',
+    'DEFAULT_DETECTOR',
     'is_bold',
     'is_italic', 
     'is_centered',
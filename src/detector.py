@@ -5,17 +5,23 @@ Enhanced Heuristic-based Heading Detection
 """
 
 import re
-from typing import Dict, List, Any, Optional
+import numpy as np
+from typing import List, Optional
 
 # Change these relative imports to absolute imports
 from utils import (
     is_bold, is_italic, is_centered, is_top_of_page,
-    clean_heading_text, is_heading_case, is_noise_text, PATTERNS
+    clean_heading_text, is_heading_case, is_noise_text, PATTERNS,
+    TextFeatures, Heading, compile_phrase_pattern, text_features
 )
 from document_types import DocumentTypeDetector, PromotionalHandler, FormalHandler
 
 # Rest of the file remains exactly the same...
 
+_LEVEL_LABELS = (None, "H1", "H2", "H3")
+
+# Promotional ranking score per level rank (index 1-3 for H1-H3)
+_PROMO_LEVEL_SCORES = (0, 8, 5, 2)
 
 class HeuristicDetector:
     """
@@ -28,24 +34,58 @@ class HeuristicDetector:
         self.promotional_handler = PromotionalHandler()
         self.formal_handler = FormalHandler()
         
-        # Enhanced pattern matching
-        self.special_patterns = {
-            'chapter_heading': re.compile(r'^(chapter|ch\.?)\s+\d+', re.IGNORECASE),
-            'section_heading': re.compile(r'^(section|sec\.?)\s+\d+', re.IGNORECASE),
-            'part_heading': re.compile(r'^(part|pt\.?)\s+[ivxlcdm\d]+', re.IGNORECASE),
-            'appendix': re.compile(r'^(appendix|app\.?)\s*[a-z\d]*', re.IGNORECASE),
-            'figure_table': re.compile(r'^(figure|fig\.?|table|tbl\.?)\s+\d+', re.IGNORECASE)
+        # Enhanced pattern matching - one alternation, the matching group
+        # (m.lastgroup) tells which kind of special heading was found
+        self._special_combined = re.compile(
+            r'^(?:'
+            r'(?P<chapter>(?:chapter|ch\.?)\s+\d+)|'
+            r'(?P<section>(?:section|sec\.?)\s+\d+)|'
+            r'(?P<part>(?:part|pt\.?)\s+[ivxlcdm\d]+)|'
+            r'(?P<appendix>(?:appendix|app\.?)\s*[a-z\d]*)|'
+            r'(?P<figure>(?:figure|fig\.?|table|tbl\.?)\s+\d+)'
+            r')',
+            re.IGNORECASE
+        )
+        
+        # Numbered or roman-numeral list items, as one match
+        self._list_re = re.compile(
+            '(?:{})|(?:{})'.format(PATTERNS['numbered'].pattern, PATTERNS['roman'].pattern),
+            re.IGNORECASE
+        )
+        
+        # Most important promotional phrases (H1 in promotional content)
+        self._h1_phrase_re = compile_phrase_pattern(
+            ["you're invited", "hope to see you", "party", "celebration"]
+        )
+        
+        # Per document type strategies; all share the signature
+        # (text, font_size, is_bold, is_centered, is_top, avg_font_size, features)
+        # and unknown types fall back to the general strategy
+        self._heading_dispatch = {
+            "promotional": self._is_promotional_heading,
+            "formal": self.formal_handler.is_formal_heading,
+        }
+        self._level_dispatch = {
+            "promotional": self._detect_promotional_level,
+            "formal": self.formal_handler.detect_heading_level,
         }
     
+    def _special_kind(self, text: str) -> Optional[str]:
+        """Return the special pattern kind text starts with, if any."""
+        m = self._special_combined.match(text)
+        return m.lastgroup if m else None
+    
     def detect_document_type(self, text_sample: str) -> str:
         """Detect document type to apply appropriate detection strategy."""
         return self.doc_detector.detect_document_type(text_sample)
     
     def is_likely_heading(self, text: str, font_size: float, is_bold: bool,
                          avg_font_size: float, is_centered: bool = False,
-                         is_top: bool = False, doc_type: str = "general") -> bool:
+                         is_top: bool = False, doc_type: str = "general",
+                         features: Optional[TextFeatures] = None) -> bool:
         """
         Determine if text is likely a heading using enhanced heuristic rules.
+        Pass precomputed ``features`` to avoid re-deriving them from ``text``.
         """
         if not text or len(text.strip()) < 2:
             return False
@@ -55,24 +95,25 @@ class HeuristicDetector:
             return False
         
         # Skip figure/table captions unless they're emphasized
-        if self.special_patterns['figure_table'].match(text) and not is_bold:
+        if not is_bold and self._special_kind(text) == 'figure':
             return False
         
         # Apply document-type specific logic
-        if doc_type == "promotional":
-            return self.promotional_handler.is_promotional_heading(
-                text, font_size, is_bold, is_centered, avg_font_size
-            )
-        elif doc_type == "formal":
-            return self.formal_handler.is_formal_heading(
-                text, font_size, is_bold, is_centered, is_top, avg_font_size
-            )
-        else:
-            return self._is_general_heading(text, font_size, is_bold,
-                                          is_centered, is_top, avg_font_size)
+        is_heading = self._heading_dispatch.get(doc_type, self._is_general_heading)
+        return is_heading(text, font_size, is_bold, is_centered, is_top,
+                          avg_font_size, features)
+    
+    def _is_promotional_heading(self, text: str, font_size: float, is_bold: bool,
+                              is_centered: bool, is_top: bool, avg_font_size: float,
+                              features: Optional[TextFeatures] = None) -> bool:
+        """Adapter giving PromotionalHandler the shared dispatch signature."""
+        return self.promotional_handler.is_promotional_heading(
+            text, font_size, is_bold, is_centered, avg_font_size, features
+        )
     
     def _is_general_heading(self, text: str, font_size: float, is_bold: bool,
-                          is_centered: bool, is_top: bool, avg_font_size: float) -> bool:
+                          is_centered: bool, is_top: bool, avg_font_size: float,
+                          features: Optional[TextFeatures] = None) -> bool:
         """General heading detection for mixed document types."""
         # Strong visual indicators
         if font_size >= avg_font_size + 3:
@@ -87,47 +128,81 @@ class HeuristicDetector:
             return True
         
         # Special patterns
-        for pattern in self.special_patterns.values():
-            if pattern.match(text):
-                return True
+        if self._special_combined.match(text):
+            return True
         
         # Numbered or bulleted lists (but not figure/table)
-        if (PATTERNS['numbered'].match(text) or PATTERNS['roman'].match(text)) and len(text) > 5:
+        if len(text) > 5 and self._list_re.match(text):
             return True
         
         return False
     
+    def may_be_heading(self, raw_text: str, font_size: float, is_bold: bool,
+                       avg_font_size: float, is_centered: bool = False,
+                       is_top: bool = False) -> bool:
+        """
+        Cheap pre-filter for detect_heading_level on non-promotional documents,
+        usable before the text is cleaned. Returns False only for lines that
+        can't qualify under the general or formal rules: body-size, non-bold,
+        off-center, below the top of the page and not starting like a
+        numbered/roman/special heading.
+        """
+        # Visual emphasis - defer to the full rules
+        if is_bold or is_centered or is_top or font_size >= avg_font_size + 2:
+            return True
+        
+        # Plain lines only qualify by pattern; cleaning just trims the end of
+        # the text, so matching the raw prefix never rejects a heading
+        return bool(self._special_combined.match(raw_text) or self._list_re.match(raw_text))
+    
     def detect_heading_level(self, text: str, font_size: float, is_bold: bool,
                            avg_font_size: float, is_centered: bool = False,
                            is_top: bool = False, doc_type: str = "general") -> Optional[str]:
         """
         Determine heading level (H1, H2, H3) based on visual hierarchy.
         """
+        # Only the promotional rules read the text features on every call
+        # (the formal handler builds them on demand)
+        tf = text_features(text) if doc_type == "promotional" else None
         if not self.is_likely_heading(text, font_size, is_bold, avg_font_size,
-                                    is_centered, is_top, doc_type):
+                                    is_centered, is_top, doc_type, tf):
             return None
         
         # Document-type specific level detection
-        if doc_type == "promotional":
-            return self._detect_promotional_level(text, font_size, is_bold,
-                                                is_centered, avg_font_size)
-        elif doc_type == "formal":
-            return self.formal_handler.detect_heading_level(
-                text, font_size, is_bold, is_centered, is_top, avg_font_size
-            )
-        else:
-            return self._detect_general_level(text, font_size, is_bold,
-                                            is_centered, is_top, avg_font_size)
+        detect_level = self._level_dispatch.get(doc_type, self._detect_general_level)
+        return detect_level(text, font_size, is_bold, is_centered, is_top,
+                            avg_font_size, tf)
     
-    def _detect_promotional_level(self, text: str, font_size: float,
-                                is_bold: bool, is_centered: bool,
-                                avg_font_size: float) -> str:
+    def detect_heading_levels(self, texts: List[str], font_sizes: np.ndarray,
+                              is_bold: List[bool], avg_font_size: float,
+                              is_centered: List[bool], is_top: List[bool],
+                              doc_type: str = "general") -> List[Optional[str]]:
+        """
+        detect_heading_level for all candidate lines of a page in one call.
+        Inputs are parallel sequences; returns one level (or None) per text.
+        """
+        # General rules have a vectorized form; the type-specific rules are
+        # text-driven, so those run per line
+        if doc_type not in self._heading_dispatch and doc_type not in self._level_dispatch:
+            levels = self.classify_levels_batch(font_sizes, is_bold, is_centered,
+                                                is_top, avg_font_size, texts)
+            return [_LEVEL_LABELS[level] for level in levels.tolist()]
+        
+        return [
+            self.detect_heading_level(text, float(size), bold, avg_font_size,
+                                      centered, top, doc_type)
+            for text, size, bold, centered, top
+            in zip(texts, font_sizes, is_bold, is_centered, is_top)
+        ]
+    
+    def _detect_promotional_level(self, text: str, font_size: float, is_bold: bool,
+                                is_centered: bool, is_top: bool, avg_font_size: float,
+                                features: Optional[TextFeatures] = None) -> str:
         """Detect heading level for promotional content."""
-        text_lower = text.lower()
+        tf = features or text_features(text)
         
         # H1 criteria - most important promotional phrases
-        h1_phrases = ["you're invited", "hope to see you", "party", "celebration"]
-        if any(phrase in text_lower for phrase in h1_phrases):
+        if self._h1_phrase_re.search(tf.lower):
             return "H1"
         
         # H1 - Large, bold, centered text
@@ -143,19 +218,20 @@ class HeuristicDetector:
             return "H2"
         
         # H2 - All caps with moderate emphasis
-        if text.isupper() and len(text) > 4 and font_size > avg_font_size:
+        if tf.is_upper and tf.length > 4 and font_size > avg_font_size:
             return "H2"
         
         # H3 - everything else that qualified as heading
         return "H3"
     
     def _detect_general_level(self, text: str, font_size: float, is_bold: bool,
-                            is_centered: bool, is_top: bool, avg_font_size: float) -> str:
+                            is_centered: bool, is_top: bool, avg_font_size: float,
+                            features: Optional[TextFeatures] = None) -> str:
         """Detect heading level for general documents."""
+        kind = self._special_kind(text)
+        
         # H1 - Largest headings or special patterns
-        if (font_size >= avg_font_size + 4 or
-            self.special_patterns['chapter_heading'].match(text) or
-            self.special_patterns['part_heading'].match(text)):
+        if font_size >= avg_font_size + 4 or kind == 'chapter' or kind == 'part':
             return "H1"
         
         # H1 - Centered, large, bold
@@ -163,8 +239,7 @@ class HeuristicDetector:
             return "H1"
         
         # H2 - Large headings or section patterns
-        if (font_size >= avg_font_size + 2 or
-            self.special_patterns['section_heading'].match(text)):
+        if font_size >= avg_font_size + 2 or kind == 'section':
             return "H2"
         
         # H2 - Bold with good size
@@ -174,43 +249,88 @@ class HeuristicDetector:
         # H3 - Everything else
         return "H3"
     
-    def rank_headings_by_importance(self, headings: List[Dict[str, Any]],
-                                  doc_type: str = "general") -> List[Dict[str, Any]]:
+    def classify_levels_batch(self, font_sizes: np.ndarray, is_bold: np.ndarray,
+                              is_centered: np.ndarray, is_top: np.ndarray,
+                              avg_font_size: float, texts: List[str]) -> np.ndarray:
+        """
+        Vectorized equivalent of detect_heading_level for general documents.
+        Inputs are parallel arrays (one entry per candidate); returns an int8
+        array of levels: 1/2/3 for H1/H2/H3 and 0 for non-headings.
+        """
+        count = len(texts)
+        font_sizes = np.asarray(font_sizes, dtype=np.float64)
+        is_bold = np.asarray(is_bold, dtype=bool)
+        is_centered = np.asarray(is_centered, dtype=bool)
+        is_top = np.asarray(is_top, dtype=bool)
+        
+        # Per-text masks, one pass over the texts each
+        kinds = np.array([self._special_kind(t) for t in texts], dtype=object)
+        special_mask = np.not_equal(kinds, None)
+        valid_mask = np.fromiter((len(t.strip()) >= 2 and not is_noise_text(t) for t in texts),
+                                 dtype=bool, count=count)
+        case_mask = np.fromiter((is_heading_case(t) for t in texts), dtype=bool, count=count)
+        list_mask = np.fromiter((len(t) > 5 and self._list_re.match(t) is not None for t in texts),
+                                dtype=bool, count=count)
+        
+        # is_likely_heading / _is_general_heading as one branchless expression
+        heading_mask = (valid_mask & ~((kinds == 'figure') & ~is_bold) &
+                        ((font_sizes >= avg_font_size + 3) |
+                         (is_bold & (font_sizes >= avg_font_size + 1.5)) |
+                         ((is_centered | is_top) & case_mask) |
+                         special_mask | list_mask))
+        
+        # _detect_general_level
+        h1 = ((font_sizes >= avg_font_size + 4) |
+              (kinds == 'chapter') | (kinds == 'part') |
+              (is_centered & is_bold & (font_sizes >= avg_font_size + 2)))
+        h2 = ((font_sizes >= avg_font_size + 2) |
+              (kinds == 'section') |
+              (is_bold & (font_sizes >= avg_font_size + 1)))
+        
+        levels = np.where(h1, 1, np.where(h2, 2, 3)).astype(np.int8)
+        return np.where(heading_mask, levels, 0).astype(np.int8)
+    
+    def rank_headings_by_importance(self, headings: List[Heading],
+                                  doc_type: str = "general") -> List[Heading]:
         """Rank headings by importance for the given document type."""
         if doc_type == "promotional":
             return self._rank_promotional_headings(headings)
         else:
             return self._rank_standard_headings(headings)
     
-    def _rank_promotional_headings(self, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _rank_promotional_headings(self, headings: List[Heading]) -> List[Heading]:
         """Rank promotional headings by importance."""
-        def importance_score(heading):
-            text_lower = heading['text'].lower()
-            score = 0
-            
-            # High-priority phrases
-            for phrase in self.promotional_handler.high_priority_phrases:
-                if phrase in text_lower:
-                    score += 10
-            
-            # Level-based scoring
-            level_scores = {"H1": 8, "H2": 5, "H3": 2}
-            score += level_scores.get(heading['level'], 0)
-            
-            # Length penalty for very long text
-            if len(heading['text']) > 100:
-                score -= 5
-            
-            return score
-        
-        return sorted(headings, key=importance_score, reverse=True)
+        count = len(headings)
+        count_phrases = self.promotional_handler.count_priority_phrases
+        
+        # One pass over the headings, then the score is pure array arithmetic
+        phrase_hits = np.fromiter((count_phrases(h.text.lower()) for h in headings),
+                                  dtype=np.int32, count=count)
+        levels = np.fromiter((_PROMO_LEVEL_SCORES[int(h.level[1])] for h in headings),
+                             dtype=np.int32, count=count)
+        lengths = np.fromiter((len(h.text) for h in headings), dtype=np.int32, count=count)
+        
+        # High-priority phrases + level-based scoring - long text penalty
+        scores = phrase_hits * 10 + levels - np.where(lengths > 100, 5, 0)
+        
+        # Stable sort on negated scores keeps ties in original order
+        order = np.argsort(-scores, kind='stable')
+        return [headings[i] for i in order]
     
-    def _rank_standard_headings(self, headings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    def _rank_standard_headings(self, headings: List[Heading]) -> List[Heading]:
         """Rank standard headings by hierarchy."""
         # Sort by page, then by level, then by position
-        level_order = {"H1": 1, "H2": 2, "H3": 3}
-        return sorted(headings, key=lambda x: (
-            x['page'],
-            level_order.get(x['level'], 4),
-            x.get('order', 0)
-        ))
+        count = len(headings)
+        pages = np.fromiter((h.page for h in headings), dtype=np.int32, count=count)
+        # Level rank straight from the label ("H2" -> 2), no dict lookup
+        levels = np.fromiter((int(h.level[1]) for h in headings),
+                             dtype=np.int8, count=count)
+        
+        # lexsort is stable (ties keep document position) and treats the
+        # last key as the primary one
+        return [headings[i] for i in np.lexsort((levels, pages))]
+
+
+# Shared instance - the detector is stateless across documents, so its
+# compiled patterns are built once per process instead of once per PDF
+DEFAULT_DETECTOR = HeuristicDetector()
@@ -3,8 +3,12 @@ Document type specific handlers
 """
 
 import re
+from functools import lru_cache
 from typing import Dict, List, Any, Optional
-from utils import PATTERNS, is_contact_info
+from utils import (
+    TextFeatures, is_contact_info, contact_hits, compile_phrase_pattern,
+    count_phrases, text_features
+)
 
 class DocumentTypeDetector:
     """Detect and handle different document types."""
@@ -26,23 +30,27 @@ class DocumentTypeDetector:
             "abstract", "thesis", "dissertation", "research", "hypothesis",
             "methodology", "results", "discussion", "conclusion", "bibliography"
         ]
+        
+        # Per-instance memo of detection results keyed by the sample itself
+        # (str caches its own hash, so repeated lookups are O(1))
+        self._detect_cached = lru_cache(maxsize=128)(self._detect_uncached)
     
     def detect_document_type(self, text_sample: str) -> str:
         """Detect document type from content analysis."""
+        return self._detect_cached(text_sample)
+    
+    def _detect_uncached(self, text_sample: str) -> str:
+        """Uncached implementation of detect_document_type."""
         text_lower = text_sample.lower()
         
-        # Count different indicators
-        promotional_count = sum(1 for indicator in self.promotional_indicators
-                              if indicator in text_lower)
-        formal_count = sum(1 for indicator in self.formal_indicators
-                          if indicator in text_lower)
-        academic_count = sum(1 for indicator in self.academic_indicators
-                           if indicator in text_lower)
+        # Count different indicators - the decision only needs to know
+        # whether a category reaches two hits, so stop counting there
+        promotional_count = count_phrases(self.promotional_indicators, text_lower, limit=2)
+        formal_count = count_phrases(self.formal_indicators, text_lower, limit=2)
+        academic_count = count_phrases(self.academic_indicators, text_lower, limit=2)
         
         # Check for contact information (indicates promotional)
-        contact_patterns = [PATTERNS['phone'], PATTERNS['url'], PATTERNS['address']]
-        contact_count = sum(1 for pattern in contact_patterns
-                          if pattern.search(text_lower))
+        contact_count = contact_hits(text_lower, limit=2)
         
         # Decision logic
         if promotional_count >= 2 or contact_count >= 2:
@@ -63,14 +71,20 @@ class PromotionalHandler:
             "join us", "rsvp", "required", "please visit", "come join",
             "special event", "don't miss", "save the date"
         ]
+        self._phrase_re = compile_phrase_pattern(self.high_priority_phrases)
+    
+    def count_priority_phrases(self, text_lower: str) -> int:
+        """Count distinct high-priority phrases in lowercased text."""
+        return count_phrases(self.high_priority_phrases, text_lower)
     
     def is_promotional_heading(self, text: str, font_size: float, is_bold: bool,
-                             is_centered: bool, avg_font_size: float) -> bool:
+                             is_centered: bool, avg_font_size: float,
+                             features: Optional[TextFeatures] = None) -> bool:
         """Determine if text is a promotional heading."""
-        text_lower = text.lower().strip()
+        tf = features or text_features(text)
         
         # Skip empty or very short text
-        if len(text) < 3:
+        if tf.length < 3:
             return False
         
         # Skip contact information unless strongly emphasized
@@ -78,9 +92,8 @@ class PromotionalHandler:
             return is_bold and font_size > avg_font_size + 2
         
         # High-priority promotional phrases
-        for phrase in self.high_priority_phrases:
-            if phrase in text_lower:
-                return True
+        if self._phrase_re.search(tf.lower):
+            return True
         
         # Visual emphasis criteria
         emphasis_score = 0
@@ -100,13 +113,13 @@ class PromotionalHandler:
             emphasis_score += 2
         
         # Case emphasis
-        if text.isupper() and len(text) > 4:
+        if tf.is_upper and tf.length > 4:
             emphasis_score += 2
-        elif text.istitle():
+        elif tf.is_title:
             emphasis_score += 1
         
         # Exclamation marks
-        if '!' in text:
+        if tf.bang_count:
             emphasis_score += 1
         
         # Need sufficient emphasis
@@ -114,15 +127,13 @@ class PromotionalHandler:
     
     def calculate_importance_score(self, text: str, font_size: float,
                                  is_bold: bool, is_centered: bool,
-                                 avg_font_size: float, page_position: float) -> float:
+                                 avg_font_size: float, page_position: float,
+                                 features: Optional[TextFeatures] = None) -> float:
         """Calculate importance score for promotional content ranking."""
-        score = 0.0
-        text_lower = text.lower()
+        tf = features or text_features(text)
         
         # High-priority phrase bonuses
-        for phrase in self.high_priority_phrases:
-            if phrase in text_lower:
-                score += 10
+        score = self.count_priority_phrases(tf.lower) * 10.0
         
         # Font size relative importance
         size_ratio = font_size / max(avg_font_size, 1)
@@ -133,11 +144,11 @@ class PromotionalHandler:
             score += 4
         if is_centered:
             score += 3
-        if text.isupper():
+        if tf.is_upper:
             score += 2
         
         # Exclamation emphasis
-        score += text.count('!') * 1.5
+        score += tf.bang_count * 1.5
         
         # Position bonuses (top and bottom are important in invitations)
         if page_position < 0.3:  # Top of page
@@ -146,9 +157,9 @@ class PromotionalHandler:
             score += 1
         
         # Length considerations
-        if 5 <= len(text) <= 50:  # Optimal heading length
+        if 5 <= tf.length <= 50:  # Optimal heading length
             score += 1
-        elif len(text) > 100:  # Too long for heading
+        elif tf.length > 100:  # Too long for heading
             score -= 2
         
         return score
@@ -164,18 +175,22 @@ class FormalHandler:
         ]
     
     def is_formal_heading(self, text: str, font_size: float, is_bold: bool,
-                        is_centered: bool, is_top: bool, avg_font_size: float) -> bool:
+                        is_centered: bool, is_top: bool, avg_font_size: float,
+                        features: Optional[TextFeatures] = None) -> bool:
         """Determine if text is a formal heading."""
         # Size-based detection
         if font_size >= avg_font_size + 2:
             return True
         
+        tf = features or text_features(text)
+        heading_case = tf.is_upper or tf.is_title
+        
         # Bold + case pattern
-        if is_bold and (text.isupper() or text.istitle()):
+        if is_bold and heading_case:
             return True
         
         # Layout-based detection
-        if (is_centered or is_top) and (text.isupper() or text.istitle()):
+        if (is_centered or is_top) and heading_case:
             return True
         
         # Pattern-based detection
@@ -186,9 +201,11 @@ class FormalHandler:
         return False
     
     def detect_heading_level(self, text: str, font_size: float, is_bold: bool,
-                           is_centered: bool, is_top: bool, avg_font_size: float) -> Optional[str]:
+                           is_centered: bool, is_top: bool, avg_font_size: float,
+                           features: Optional[TextFeatures] = None) -> Optional[str]:
         """Detect heading level for formal documents."""
-        if not self.is_formal_heading(text, font_size, is_bold, is_centered, is_top, avg_font_size):
+        if not self.is_formal_heading(text, font_size, is_bold, is_centered, is_top,
+                                      avg_font_size, features):
             return None
         
         # H1 - Largest headings
@@ -4,36 +4,77 @@ Enhanced for better accuracy and performance
 """
 
 import fitz  # PyMuPDF
+import numpy as np
+import gc
+import os
 import time
 import logging
-from typing import Dict, List, Any, Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, NamedTuple
 from pathlib import Path
 
-from detector import HeuristicDetector
-from document_types import PromotionalHandler
+from detector import HeuristicDetector, DEFAULT_DETECTOR
 from utils import (
-    is_bold, is_italic, is_centered, is_top_of_page, is_bottom_of_page,
+    is_italic, is_centered, is_top_of_page, is_bottom_of_page,
+    is_centered_fast, is_top_fast, majority_bold,
     clean_heading_text, is_heading_case, is_noise_text, is_contact_info,
-    calculate_text_stats, detect_outline_from_toc, extract_page_position,
-    validate_heading_hierarchy, merge_similar_headings
+    calculate_text_stats, calculate_document_stats, page_text_arrays,
+    detect_outline_from_toc, extract_page_position,
+    validate_heading_hierarchy, merge_similar_headings, text_features, Heading
 )
 
 # Set up logging
 logger = logging.getLogger(__name__)
 
-def extract_outline(pdf_path: str) -> Dict[str, Any]:
+# Text extraction flags - ligatures are expanded to plain characters.
+# Image blocks are kept: dropping them changes how MuPDF groups the
+# surrounding text into lines.
+PAGE_TEXT_FLAGS = fitz.TEXTFLAGS_DICT & ~fitz.TEXT_PRESERVE_LIGATURES
+
+def read_page_blocks(page: fitz.Page) -> List[Dict[str, Any]]:
+    """Return the blocks of a page from a single-use TextPage."""
+    return page.get_textpage(flags=PAGE_TEXT_FLAGS).extractDICT()["blocks"]
+
+# Per-page parallelism - pool startup only pays off on longer documents
+DEFAULT_PAGE_WORKERS = min(os.cpu_count() or 1, 4)
+MIN_PAGES_FOR_POOL = 16
+
+# Page dicts allocate many short-lived containers; collect gen0 less often
+GC_THRESHOLD = (50_000, 10, 10)
+
+# Document opened once per page worker process (see _init_page_worker)
+_worker_doc = None
+
+def _init_page_worker(pdf_bytes: bytes) -> None:
+    """Open the PDF once in each page worker process, from the parent's bytes."""
+    global _worker_doc
+    gc.set_threshold(*GC_THRESHOLD)
+    _worker_doc = fitz.open(stream=pdf_bytes, filetype="pdf")
+
+def _read_page_lines(page_num: int) -> Optional["PageLines"]:
+    """Read one page's line features in a page worker process."""
+    try:
+        return read_page_lines(_worker_doc[page_num])
+    except Exception as e:
+        logger.warning("Error reading page %d: %s", page_num, e)
+        return None
+
+def extract_outline(pdf_path: str, page_workers: int = 1) -> Dict[str, Any]:
     """
     Main function to extract document outline using heuristic approach only.
     Enhanced with better document type detection and improved accuracy.
+    
+    With ``page_workers > 1``, pages of long documents are read in a pool of
+    that many worker processes; headings are then classified in order here.
     """
     start_time = time.time()
     doc = None
     
     try:
         doc = fitz.open(pdf_path)
-        logger.info(f"Successfully opened PDF: {pdf_path}")
+        logger.info("Successfully opened PDF: %s", pdf_path)
     except Exception as e:
-        logger.error(f"Failed to open PDF: {e}")
+        logger.error("Failed to open PDF: %s", e)
         return {
             "title": "Error: Could not open PDF",
             "outline": [],
@@ -41,8 +82,8 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
         }
     
     try:
-        # Initialize detector
-        detector = HeuristicDetector()
+        # Shared detector (patterns compiled once per process)
+        detector = DEFAULT_DETECTOR
         
         # First, try extracting from built-in TOC
         toc_outline = detect_outline_from_toc(doc)
@@ -55,7 +96,7 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
             doc = None  # Mark as closed
             return {
                 "title": title,
-                "outline": toc_outline,
+                "outline": [h._asdict() for h in toc_outline],
                 "metadata": {
                     "extraction_method": "toc",
                     "processing_time": time.time() - start_time,
@@ -63,48 +104,72 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
                 }
             }
         
+        # Type detection and the title use the first pages' full blocks;
+        # every page is then reduced to its line features in a single read,
+        # and those are all that is kept until the statistics are known
+        total_pages = len(doc)
+        first_blocks = {}
+        for page_num in range(min(total_pages, 3)):
+            try:
+                first_blocks[page_num] = read_page_blocks(doc[page_num])
+            except Exception as e:
+                logger.warning("Error reading page %d: %s", page_num, e)
+                continue
+        
         # Detect document type from content
-        doc_type = detect_document_type(doc)
-        logger.info(f"Detected document type: {doc_type}")
+        doc_type = detect_document_type(list(first_blocks.values()))
+        logger.info("Detected document type: %s", doc_type)
         
-        # Calculate document statistics from first few pages
-        all_blocks = []
-        pages_to_sample = min(len(doc), 5)
-        for page_num in range(pages_to_sample):
+        pages = [None] * total_pages
+        for page_num, blocks in first_blocks.items():
             try:
-                page = doc[page_num]
-                blocks = page.get_text("dict")["blocks"]
-                all_blocks.extend(blocks)
+                rect = doc[page_num].rect
+                pages[page_num] = page_lines(blocks, rect.width, rect.height)
             except Exception as e:
-                logger.warning(f"Error reading page {page_num}: {e}")
+                logger.warning("Error reading page %d: %s", page_num, e)
                 continue
         
-        stats = calculate_text_stats(all_blocks)
+        remaining = range(min(total_pages, 3), total_pages)
+        if page_workers > 1 and total_pages >= MIN_PAGES_FOR_POOL:
+            # Page reads dominate; workers open one in-memory copy of the file
+            pdf_bytes = Path(pdf_path).read_bytes()
+            with ProcessPoolExecutor(max_workers=page_workers,
+                                     initializer=_init_page_worker,
+                                     initargs=(pdf_bytes,)) as executor:
+                for page_num, lines in zip(remaining,
+                                           executor.map(_read_page_lines, remaining)):
+                    pages[page_num] = lines
+        else:
+            for page_num in remaining:
+                try:
+                    pages[page_num] = read_page_lines(doc[page_num])
+                except Exception as e:
+                    logger.warning("Error reading page %d: %s", page_num, e)
+                    continue
+        
+        # Document statistics over all pages (a cover or TOC in the first
+        # pages no longer skews the averages)
+        stats = calculate_document_stats(
+            (lines.font_sizes, lines.line_heights) for lines in pages if lines is not None
+        )
         
         # Extract title
-        title = extract_title(doc, stats)
+        title = extract_title(doc, stats, first_blocks.get(0))
+        first_blocks.clear()
         
-        # Extract headings based on document type
+        # Extract headings based on document type, in page order
         outline = []
         seen_headings = set()
-        total_pages = len(doc)
         
-        for page_num in range(total_pages):
+        for page_num, lines in enumerate(pages):
+            if lines is None:
+                continue
             try:
-                page = doc[page_num]
-                blocks = page.get_text("dict")["blocks"]
-                page_width, page_height = page.rect.width, page.rect.height
-                
-                page_headings = extract_page_headings(
-                    blocks, page_num + 1, page_width, page_height,
-                    stats, detector, doc_type, seen_headings
-                )
-                
-                outline.extend(page_headings)
-                seen_headings.update(h["text"] for h in page_headings)
-                
+                outline.extend(extract_line_headings(
+                    lines, page_num + 1, stats, detector, doc_type, seen_headings
+                ))
             except Exception as e:
-                logger.warning(f"Error processing page {page_num + 1}: {e}")
+                logger.warning("Error processing page %d: %s", page_num + 1, e)
                 continue
         
         # Post-process outline
@@ -116,7 +181,7 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
         
         return {
             "title": title,
-            "outline": outline,
+            "outline": [h._asdict() for h in outline],
             "metadata": {
                 "extraction_method": "heuristic",
                 "document_type": doc_type,
@@ -127,7 +192,7 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
         }
     
     except Exception as e:
-        logger.error(f"Error processing PDF: {e}")
+        logger.error("Error processing PDF: %s", e)
         
         # Ensure document is closed even on error
         if doc is not None:
@@ -145,81 +210,89 @@ def extract_outline(pdf_path: str) -> Dict[str, Any]:
             }
         }
 
-def detect_document_type(doc) -> str:
-    """Detect document type from content analysis."""
+def detect_document_type(pages_blocks: List[List[Dict[str, Any]]]) -> str:
+    """Detect document type from the text blocks of the first few pages."""
     try:
-        # Sample first few pages for performance
-        sample_pages = min(3, len(doc))
-        total_text = ""
-        
-        for page_num in range(sample_pages):
-            try:
-                page = doc[page_num]
-                text = page.get_text().lower()
-                total_text += text
-            except Exception as e:
-                logger.warning(f"Error reading page {page_num} for type detection: {e}")
-                continue
+        # Rebuild the plain page text (one line per text line) from the blocks
+        total_text = "".join(
+            "".join(span["text"] for span in line["spans"]) + "\n"
+            for blocks in pages_blocks
+            for block in blocks if "lines" in block
+            for line in block["lines"]
+        ).lower()
         
         # Use heuristic detector for document type detection
-        detector = HeuristicDetector()
-        return detector.detect_document_type(total_text)
+        return DEFAULT_DETECTOR.detect_document_type(total_text)
     
     except Exception as e:
-        logger.warning(f"Error detecting document type: {e}")
+        logger.warning("Error detecting document type: %s", e)
         return "general"
 
-def extract_title(doc, stats: Dict[str, float] = None) -> str:
-    """Extract document title using multiple strategies."""
+def extract_title(doc, stats: Dict[str, float] = None,
+                  first_page_blocks: Optional[List[Dict[str, Any]]] = None) -> str:
+    """Extract document title using multiple strategies.
+    
+    Pass ``first_page_blocks`` when page 1 has already been extracted.
+    """
     try:
         # Strategy 1: PDF metadata
         metadata = doc.metadata
         if metadata and metadata.get("title"):
             title = metadata["title"].strip()
             if title and not title.lower().endswith('.pdf'):
+                logger.info("Using title from PDF metadata")
                 return clean_heading_text(title)
     except Exception as e:
-        logger.warning(f"Error reading PDF metadata: {e}")
+        logger.warning("Error reading PDF metadata: %s", e)
     
     # Strategy 2: First page analysis
     try:
         if len(doc) > 0:
             page = doc[0]
-            blocks = page.get_text("dict")["blocks"]
+            blocks = first_page_blocks
+            if blocks is None:
+                blocks = read_page_blocks(page)
             page_width, page_height = page.rect.width, page.rect.height
             
             if not stats:
                 stats = calculate_text_stats(blocks)
             
-            title_candidates = []
+            # Titles sit in the top half of the page - score those blocks
+            # first and only fall back to the rest when none qualify
+            title_limit = page_height * 0.5
+            text_blocks = [block for block in blocks if "lines" in block]
+            top_blocks = [block for block in text_blocks
+                          if block.get("bbox", (0, 0, 0, 0))[1] < title_limit]
+            lower_blocks = [block for block in text_blocks
+                            if block.get("bbox", (0, 0, 0, 0))[1] >= title_limit]
             
-            for block in blocks:
-                if "lines" not in block:
-                    continue
+            for region in (top_blocks, lower_blocks):
+                title_candidates = []
                 
-                for line in block["lines"]:
-                    spans = line["spans"]
-                    if not spans:
-                        continue
-                    
-                    text = "".join(span["text"] for span in spans).strip()
-                    text = clean_heading_text(text)
-                    
-                    if not text or len(text) < 5 or is_noise_text(text):
-                        continue
-                    
-                    # Calculate title score
-                    score = calculate_title_score(text, spans, block, page_width, 
-                                                page_height, stats)
-                    title_candidates.append((score, text))
-            
-            # Return highest scoring title
-            if title_candidates:
-                title_candidates.sort(reverse=True)
-                return title_candidates[0][1]
+                for block in region:
+                    for line in block["lines"]:
+                        spans = line["spans"]
+                        if not spans:
+                            continue
+                        
+                        text = "".join(span["text"] for span in spans).strip()
+                        text = clean_heading_text(text)
+                        
+                        if not text or len(text) < 5 or is_noise_text(text):
+                            continue
+                        
+                        # Calculate title score
+                        score = calculate_title_score(text, spans, block, page_width, 
+                                                    page_height, stats)
+                        title_candidates.append((score, text))
+                
+                # Return highest scoring title
+                if title_candidates:
+                    title_candidates.sort(reverse=True)
+                    return title_candidates[0][1]
     
     except Exception as e:
-        logger.warning(f"Error extracting title from first page: {e}")
+        logger.warning("Error extracting title from first page: %s", e)
     
     return ""
 
@@ -236,8 +309,7 @@ def calculate_title_score(text: str, spans: List[Dict[str, Any]],
         score += min(size_ratio * 2, 5)
         
         # Bold bonus
-        bold_spans = sum(is_bold(span) for span in spans)
-        if bold_spans / len(spans) > 0.5:
+        if majority_bold(spans):
             score += 3
         
         # Centered bonus
@@ -265,147 +337,168 @@ def calculate_title_score(text: str, spans: List[Dict[str, Any]],
         return score
     
     except Exception as e:
-        logger.warning(f"Error calculating title score: {e}")
+        logger.warning("Error calculating title score: %s", e)
         return 0.0
 
-def extract_page_headings(blocks: List[Dict[str, Any]], page_num: int,
-                         page_width: float, page_height: float,
-                         stats: Dict[str, float], detector: HeuristicDetector,
-                         doc_type: str, seen_headings: set) -> List[Dict[str, Any]]:
-    """Extract headings from a single page."""
-    try:
-        headings = []
-        
-        # Handle promotional content separately
-        if doc_type == "promotional":
-            return extract_promotional_headings(
-                blocks, page_num, page_width, page_height, stats, seen_headings
-            )
-        
-        # Standard heading extraction
-        for order, block in enumerate(blocks):
-            if "lines" not in block:
+class PageLines(NamedTuple):
+    """Per-line features of one page that don't depend on document statistics."""
+    texts: List[str]          # joined span text, stripped (not yet cleaned)
+    avg_sizes: List[float]
+    bolds: List[bool]
+    centered: List[bool]      # block-level layout, repeated per line
+    tops: List[bool]
+    positions: List[float]    # block top relative to the page height
+    font_sizes: np.ndarray    # page_text_arrays() for the document statistics
+    line_heights: np.ndarray
+
+def page_lines(blocks: List[Dict[str, Any]], page_width: float,
+               page_height: float) -> PageLines:
+    """Reduce a page's blocks to the line features heading extraction needs."""
+    texts, avg_sizes, bolds, centereds, tops, positions = [], [], [], [], [], []
+    page_half_w = page_width * 0.5
+    centered_tol = page_width * 0.15
+    top_limit = page_height * 0.25
+    
+    for block in blocks:
+        if "lines" not in block:
+            continue
+        
+        # PyMuPDF text blocks always carry a 4-tuple bbox
+        bbox = block["bbox"]
+        centered = is_centered_fast(bbox, page_half_w, centered_tol)
+        top = is_top_fast(bbox, top_limit)
+        position = extract_page_position(block, page_height)
+        
+        for line in block["lines"]:
+            spans = line["spans"]
+            if not spans:
                 continue
             
-            for line in block["lines"]:
-                spans = line["spans"]
-                if not spans:
-                    continue
-                
-                text = "".join(span["text"] for span in spans).strip()
-                text = clean_heading_text(text)
-                
-                if not text or len(text) < 2 or text in seen_headings:
-                    continue
-                
-                # Calculate text properties
-                font_sizes = [span.get("size", 12) for span in spans]
-                avg_size = sum(font_sizes) / len(font_sizes)
-                
-                bold_spans = [is_bold(span) for span in spans]
-                is_bold_text = sum(bold_spans) / len(bold_spans) > 0.5
-                
-                # Layout analysis
-                centered = is_centered(block, page_width)
-                top = is_top_of_page(block, page_height)
-                
-                # Detect heading level
-                level = detector.detect_heading_level(
-                    text, avg_size, is_bold_text, stats["avg_font_size"],
-                    centered, top, doc_type
-                )
-                
-                if level:
-                    headings.append({
-                        "level": level,
-                        "text": text,
-                        "page": page_num,
-                        # "order": order,
-                        # "confidence": "heuristic"
-                    })
-        
+            texts.append("".join(span["text"] for span in spans).strip())
+            avg_sizes.append(sum(span.get("size", 12) for span in spans) / len(spans))
+            bolds.append(majority_bold(spans))
+            centereds.append(centered)
+            tops.append(top)
+            positions.append(position)
+    
+    font_sizes, line_heights = page_text_arrays(blocks)
+    return PageLines(texts, avg_sizes, bolds, centereds, tops, positions,
+                     font_sizes, line_heights)
+
+def read_page_lines(page: fitz.Page) -> PageLines:
+    """Read a page and reduce it to its line features; the blocks are dropped."""
+    return page_lines(read_page_blocks(page), page.rect.width, page.rect.height)
+
+def extract_line_headings(lines: PageLines, page_num: int,
+                          stats: Dict[str, float], detector: HeuristicDetector,
+                          doc_type: str, seen_headings: set) -> List[Heading]:
+    """Extract headings from a single page's line features.
+    
+    Accepted heading texts are added to ``seen_headings``, so repeats on the
+    same or later pages are skipped. Errors propagate to the caller, which
+    handles them per page.
+    """
+    headings = []
+    
+    # Handle promotional content separately
+    if doc_type == "promotional":
+        return extract_promotional_headings(lines, page_num, stats, seen_headings)
+    
+    # Standard heading extraction - candidates as parallel lists
+    texts, sizes, bolds, centereds, tops = [], [], [], [], []
+    avg_font_size = stats["avg_font_size"]
+    
+    for text, size, bold, centered, top in zip(lines.texts, lines.avg_sizes, lines.bolds,
+                                              lines.centered, lines.tops):
+        # Skip plain body lines before any cleaning/regex work
+        if not detector.may_be_heading(text, size, bold, avg_font_size,
+                                       centered, top):
+            continue
+        
+        text = clean_heading_text(text)
+        
+        if not text or len(text) < 2 or text in seen_headings:
+            continue
+        
+        texts.append(text)
+        sizes.append(size)
+        bolds.append(bold)
+        centereds.append(centered)
+        tops.append(top)
+    
+    if not texts:
         return headings
     
-    except Exception as e:
-        logger.warning(f"Error extracting headings from page {page_num}: {e}")
-        return []
+    # Detect heading levels for the whole page in one call
+    levels = detector.detect_heading_levels(
+        texts, np.asarray(sizes, dtype=np.float64), bolds, avg_font_size,
+        centereds, tops, doc_type
+    )
+    
+    for text, level in zip(texts, levels):
+        if level and text not in seen_headings:
+            seen_headings.add(text)
+            headings.append(Heading(level, text, page_num))
+    
+    return headings
 
-def extract_promotional_headings(blocks: List[Dict[str, Any]], page_num: int,
-                               page_width: float, page_height: float,
-                               stats: Dict[str, float], seen_headings: set) -> List[Dict[str, Any]]:
+def extract_promotional_headings(lines: PageLines, page_num: int,
+                               stats: Dict[str, float], seen_headings: set) -> List[Heading]:
     """Extract headings from promotional content like party invitations."""
-    try:
-        promotional_handler = PromotionalHandler()
-        text_candidates = []
-        
-        for block in blocks:
-            if "lines" not in block:
-                continue
-            
-            for line in block["lines"]:
-                spans = line["spans"]
-                if not spans:
-                    continue
-                
-                text = "".join(span["text"] for span in spans).strip()
-                text = clean_heading_text(text)
-                
-                if not text or len(text) < 2 or text in seen_headings:
-                    continue
-                
-                # Calculate text properties
-                font_sizes = [span.get("size", 12) for span in spans]
-                avg_size = sum(font_sizes) / len(font_sizes)
-                
-                bold_spans = [is_bold(span) for span in spans]
-                is_bold_text = sum(bold_spans) / len(bold_spans) > 0.5
-                
-                # Layout analysis
-                centered = is_centered(block, page_width)
-                page_position = extract_page_position(block, page_height)
-                
-                # Check if it's a promotional heading
-                if promotional_handler.is_promotional_heading(
-                    text, avg_size, is_bold_text, centered, stats["avg_font_size"]
-                ):
-                    importance = promotional_handler.calculate_importance_score(
-                        text, avg_size, is_bold_text, centered,
-                        stats["avg_font_size"], page_position
-                    )
-                    
-                    text_candidates.append({
-                        "text": text,
-                        "importance": importance,
-                        "page": page_num
-                    })
-        
-        # Sort by importance and assign levels
-        text_candidates.sort(key=lambda x: x["importance"], reverse=True)
-        headings = []
-        
-        for i, candidate in enumerate(text_candidates[:5]):  # Limit to top 5
-            if i == 0:
-                level = "H1"
-            elif i <= 2:
-                level = "H2"
-            else:
-                level = "H3"
+    # Shared handler - phrase patterns are compiled once per process
+    promotional_handler = DEFAULT_DETECTOR.promotional_handler
+    text_candidates = []
+    avg_font_size = stats["avg_font_size"]
+    
+    for text, avg_size, is_bold_text, centered, page_position in zip(
+            lines.texts, lines.avg_sizes, lines.bolds, lines.centered, lines.positions):
+        text = clean_heading_text(text)
+        
+        if not text or len(text) < 2 or text in seen_headings:
+            continue
+        
+        # Check if it's a promotional heading (features shared by both calls)
+        features = text_features(text)
+        if promotional_handler.is_promotional_heading(
+            text, avg_size, is_bold_text, centered, avg_font_size,
+            features
+        ):
+            importance = promotional_handler.calculate_importance_score(
+                text, avg_size, is_bold_text, centered,
+                avg_font_size, page_position, features
+            )
             
-            headings.append({
-                "level": level,
-                "text": candidate["text"],
-                "page": candidate["page"],
-                # "confidence": "promotional"
+            text_candidates.append({
+                "text": text,
+                "importance": importance,
+                "page": page_num
             })
+    
+    # Sort by importance and assign levels
+    text_candidates.sort(key=lambda x: x["importance"], reverse=True)
+    headings = []
+    
+    for candidate in text_candidates:
+        if candidate["text"] in seen_headings:
+            continue  # Repeated line on this page
+        
+        i = len(headings)
+        if i == 0:
+            level = "H1"
+        elif i <= 2:
+            level = "H2"
+        else:
+            level = "H3"
         
-        return headings
+        seen_headings.add(candidate["text"])
+        headings.append(Heading(level, candidate["text"], candidate["page"]))
+        if len(headings) == 5:  # Limit to top 5
+            break
     
-    except Exception as e:
-        logger.warning(f"Error extracting promotional headings from page {page_num}: {e}")
-        return []
+    return headings
 
-def post_process_outline(outline: List[Dict[str, Any]], doc_type: str,
-                        detector: HeuristicDetector) -> List[Dict[str, Any]]:
+def post_process_outline(outline: List[Heading], doc_type: str,
+                        detector: HeuristicDetector) -> List[Heading]:
     """Post-process and refine the extracted outline."""
     try:
         if not outline:
@@ -427,5 +520,5 @@ def post_process_outline(outline: List[Dict[str, Any]], doc_type: str,
             return outline[:50]  # Standard limit
     
     except Exception as e:
-        logger.warning(f"Error post-processing outline: {e}")
+        logger.warning("Error post-processing outline: %s", e)
         return outline[:10]  # Return first 10 as fallback
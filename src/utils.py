@@ -5,9 +5,13 @@ Performance optimized with caching
 
 import re
 import numpy as np
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, NamedTuple, Iterable, Tuple
 from functools import lru_cache
 
+# Per-string memo size for the text predicates below. Running headers,
+# footers and TOC entries repeat across pages, so hits are common.
+PREDICATE_CACHE_SIZE = 4096
+
 # Cached regex patterns for performance
 PATTERNS = {
     'noise': re.compile(r'^\d+$|^page\s+\d+|^fig\w*\s*\d+|^table\s*\d+|^www\.|^https?://|^\[.*\]$|^copyright|^all rights reserved|^©|^\s*$', re.IGNORECASE),
@@ -20,36 +24,114 @@ PATTERNS = {
     'bullet': re.compile(r'^[•·▪▫◦‣⁃]\s+', re.IGNORECASE)
 }
 
-def is_bold(span: Dict[str, Any]) -> bool:
-    """Bold detection - removed caching due to dict parameter."""
-    if not isinstance(span, dict):
-        return False
-    
-    font_name = span.get("font", "").lower()
-    flags = span.get("flags", 0)
-    
-    # Font name indicators
-    bold_indicators = ["bold", "black", "heavy", "semibold", "demi"]
-    font_bold = any(indicator in font_name for indicator in bold_indicators)
-    
-    # Flags check (bit 4 for bold in PyMuPDF)
-    flag_bold = (flags & 16) != 0
+# Noise (anchored at the start), URLs and emails as one alternation for
+# is_noise_text - any match means noise, so a single search decides
+PATTERNS['noise_or_link'] = re.compile(
+    '(?:{})|(?:{})|(?:{})'.format(
+        PATTERNS['noise'].pattern, PATTERNS['url'].pattern, PATTERNS['email'].pattern
+    ),
+    re.IGNORECASE
+)
+
+# Font name style indicators, scanned once per span
+_BOLD_RE = re.compile(r'bold|black|heavy|semibold|demi', re.IGNORECASE)
+_ITALIC_RE = re.compile(r'italic|oblique', re.IGNORECASE)
+
+# All contact patterns as one alternation - a single scan per text
+PATTERNS['contact'] = re.compile(
+    '|'.join(PATTERNS[name].pattern for name in ('phone', 'url', 'email', 'address')),
+    re.IGNORECASE
+)
+
+# Contact kinds counted by document type detection
+_CONTACT_KINDS = (PATTERNS['phone'], PATTERNS['url'], PATTERNS['address'])
+
+def contact_hits(text: str, limit: Optional[int] = None) -> int:
+    """Count the distinct kinds of contact info (phone, url, address) in text.
+    
+    Each kind is one search that stops at its first match; counting stops
+    early once ``limit`` kinds have been seen.
+    """
+    count = 0
+    for pattern in _CONTACT_KINDS:
+        if pattern.search(text):
+            count += 1
+            if count == limit:
+                break
+    return count
+
+class Heading(NamedTuple):
+    """One outline entry; converted to a dict only for the JSON output."""
+    level: str
+    text: str
+    page: int
+
+class TextFeatures(NamedTuple):
+    """String features of a heading candidate, computed once per candidate."""
+    lower: str
+    is_upper: bool
+    is_title: bool
+    length: int
+    bang_count: int
+
+def text_features(text: str) -> TextFeatures:
+    """Compute the string features shared by the heading detectors."""
+    return TextFeatures(text.lower(), text.isupper(), text.istitle(),
+                        len(text), text.count('!'))
+
+def compile_phrase_pattern(phrases: List[str]) -> re.Pattern:
+    """Compile literal phrases into a single alternation for presence checks.
     
-    return font_bold or flag_bold
+    Use count_phrases() to count them - a plain alternation doesn't report
+    overlapping phrases (e.g. "come join" and "join us").
+    """
+    return re.compile('|'.join(re.escape(p) for p in sorted(phrases, key=len, reverse=True)))
+
+def count_phrases(phrases: Iterable[str], text: str, limit: Optional[int] = None) -> int:
+    """Count how many of the literal phrases occur in text.
+    
+    Counting stops early once ``limit`` phrases have been found.
+    """
+    count = 0
+    for phrase in phrases:
+        if phrase in text:
+            count += 1
+            if count == limit:
+                break
+    return count
+
+@lru_cache(maxsize=512)
+def _bold_key(font: str, flags: int) -> bool:
+    """Bold check keyed on (font, flags) - a PDF uses only a handful of fonts."""
+    return _BOLD_RE.search(font) is not None or (flags & 16) != 0
+
+@lru_cache(maxsize=512)
+def _italic_key(font: str, flags: int) -> bool:
+    """Italic check keyed on (font, flags)."""
+    return _ITALIC_RE.search(font) is not None or (flags & 2) != 0
+
+def is_bold(span: Dict[str, Any]) -> bool:
+    """Bold detection from the font name or PyMuPDF flags (bit 4)."""
+    return _bold_key(span.get("font", ""), span.get("flags", 0))
+
+def majority_bold(spans: List[Dict[str, Any]]) -> bool:
+    """True when more than half of the spans are bold; stops once decided."""
+    threshold = len(spans) // 2 + 1
+    bold = plain = 0
+    for span in spans:
+        if is_bold(span):
+            bold += 1
+            if bold >= threshold:
+                return True
+        else:
+            plain += 1
+            if plain >= threshold:
+                return False
+    return bold * 2 > len(spans)
 
 def is_italic(span: Dict[str, Any]) -> bool:
-    """Check if text is italic - removed caching due to dict parameter."""
-    if not isinstance(span, dict):
-        return False
-    
-    font_name = span.get("font", "").lower()
-    flags = span.get("flags", 0)
-    
-    italic_indicators = ["italic", "oblique"]
-    font_italic = any(indicator in font_name for indicator in italic_indicators)
-    flag_italic = (flags & 2) != 0
-    
-    return font_italic or flag_italic
+    """Check if text is italic from the font name or PyMuPDF flags (bit 1)."""
+    return _italic_key(span.get("font", ""), span.get("flags", 0))
 
 def is_centered(block: Dict[str, Any], page_width: float, tolerance: float = 0.15) -> bool:
     """Center detection."""
@@ -68,6 +150,15 @@ def is_top_of_page(block: Dict[str, Any], page_height: float, max_pct: float = 0
         return False
     return bbox[1] < page_height * max_pct
 
+def is_centered_fast(bbox, page_half_w: float, tolerance_w: float) -> bool:
+    """is_centered for a known 4-tuple bbox, with the page half-width and
+    ``tolerance * page_width`` precomputed by the caller."""
+    return abs((bbox[0] + bbox[2]) * 0.5 - page_half_w) < tolerance_w
+
+def is_top_fast(bbox, top_limit: float) -> bool:
+    """is_top_of_page for a known 4-tuple bbox and precomputed limit."""
+    return bbox[1] < top_limit
+
 def is_bottom_of_page(block: Dict[str, Any], page_height: float, min_pct: float = 0.75) -> bool:
     """Check if block is at bottom of page."""
     bbox = block.get("bbox", [0, 0, 0, 0])
@@ -75,7 +166,7 @@ def is_bottom_of_page(block: Dict[str, Any], page_height: float, min_pct: float
         return False
     return bbox[1] > page_height * min_pct
 
-@lru_cache(maxsize=2000)
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
 def is_heading_case(text: str) -> bool:
     """Heading case detection with caching - text is hashable."""
     if not text:
@@ -106,17 +197,19 @@ def clean_heading_text(text: str) -> str:
         return ""
     
     # Remove excessive whitespace
-    text = re.sub(r'\s+', ' ', text.strip())
+    text = " ".join(text.split())
     
     # Remove trailing punctuation
-    text = re.sub(r'[.\-_]+$', '', text)
+    text = text.rstrip(".-_")
     
-    # Remove page numbers at the end
-    text = re.sub(r'\s+\d+$', '', text)
+    # Remove page numbers at the end (isdecimal matches what \d does)
+    space = text.rfind(" ")
+    if space >= 0 and text[space + 1:].isdecimal():
+        text = text[:space]
     
     return text.strip()
 
-@lru_cache(maxsize=2000)
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
 def is_noise_text(text: str) -> bool:
     """Detect noise text that shouldn't be considered as headings."""
     if not text:
@@ -124,10 +217,6 @@ def is_noise_text(text: str) -> bool:
     
     text_clean = text.strip()
     
-    # Use cached pattern
-    if PATTERNS['noise'].match(text_clean):
-        return True
-    
     # Very short text (but allow some short meaningful headings)
     if len(text_clean) < 2:
         return True
@@ -136,31 +225,42 @@ def is_noise_text(text: str) -> bool:
     if text_clean.isdigit():
         return True
     
-    # URLs and emails
-    if PATTERNS['url'].search(text_clean) or PATTERNS['email'].search(text_clean):
-        return True
-    
-    return False
+    # Noise prefixes, URLs and emails - one combined search
+    return PATTERNS['noise_or_link'].search(text_clean) is not None
 
-def calculate_text_stats(blocks: List[Dict[str, Any]]) -> Dict[str, float]:
-    """Calculate text statistics for the document."""
-    font_sizes = []
-    line_heights = []
-    
-    for block in blocks:
-        if "lines" not in block:
-            continue
-        
-        for line in block["lines"]:
-            for span in line["spans"]:
-                if span.get("text", "").strip():
-                    font_sizes.append(span.get("size", 12))
-                    
-            bbox = line.get("bbox", [0, 0, 0, 0])
-            if len(bbox) >= 4:
-                line_heights.append(bbox[3] - bbox[1])
-    
-    if not font_sizes:
+def page_text_arrays(blocks: Iterable[Dict[str, Any]]) -> Tuple[np.ndarray, np.ndarray]:
+    """Font sizes of non-blank spans and line heights of one page's blocks."""
+    # Flatten once, then let NumPy build the arrays in C-level loops
+    lines = [line for block in blocks if "lines" in block for line in block["lines"]]
+    
+    font_sizes_np = np.fromiter(
+        (span.get("size", 12) for line in lines for span in line["spans"]
+         if span.get("text", "").strip()),
+        dtype=np.float64
+    )
+    line_heights_np = np.fromiter(
+        (line["bbox"][3] - line["bbox"][1] for line in lines
+         if len(line.get("bbox", ())) >= 4),
+        dtype=np.float64
+    )
+    return font_sizes_np, line_heights_np
+
+def calculate_text_stats(blocks: Iterable[Dict[str, Any]]) -> Dict[str, float]:
+    """Calculate text statistics for the document (blocks may be any iterable)."""
+    return _stats_from_arrays(*page_text_arrays(blocks))
+
+def calculate_document_stats(page_arrays: Iterable[Tuple[np.ndarray, np.ndarray]]) -> Dict[str, float]:
+    """Text statistics over every page, from per-page ``page_text_arrays``."""
+    page_arrays = list(page_arrays)
+    if not page_arrays:
+        return _stats_from_arrays(np.empty(0), np.empty(0))
+    
+    sizes, heights = zip(*page_arrays)
+    return _stats_from_arrays(np.concatenate(sizes), np.concatenate(heights))
+
+def _stats_from_arrays(font_sizes_np: np.ndarray, line_heights_np: np.ndarray) -> Dict[str, float]:
+    """Summary statistics of flattened span font sizes and line heights."""
+    if not font_sizes_np.size:
         return {
             "avg_font_size": 12,
             "max_font_size": 12,
@@ -170,20 +270,20 @@ def calculate_text_stats(blocks: List[Dict[str, Any]]) -> Dict[str, float]:
             "total_text_blocks": 0
         }
     
-    font_sizes_np = np.array(font_sizes)
-    line_heights_np = np.array(line_heights) if line_heights else np.array([15])
+    if not line_heights_np.size:
+        line_heights_np = np.array([15.0])
     
     return {
-        "avg_font_size": float(np.mean(font_sizes_np)),
-        "max_font_size": float(np.max(font_sizes_np)),
-        "min_font_size": float(np.min(font_sizes_np)),
-        "std_font_size": float(np.std(font_sizes_np)),
-        "avg_line_height": float(np.mean(line_heights_np)),
-        "total_text_blocks": len(font_sizes)
+        "avg_font_size": float(font_sizes_np.mean()),
+        "max_font_size": float(font_sizes_np.max()),
+        "min_font_size": float(font_sizes_np.min()),
+        "std_font_size": float(font_sizes_np.std()),
+        "avg_line_height": float(line_heights_np.mean()),
+        "total_text_blocks": int(font_sizes_np.size)
     }
 
 # Rest of the functions remain the same...
-def detect_outline_from_toc(doc) -> List[Dict[str, Any]]:
+def detect_outline_from_toc(doc) -> List[Heading]:
     """Extract outline from document's table of contents."""
     outline = []
     
@@ -202,38 +302,17 @@ def detect_outline_from_toc(doc) -> List[Dict[str, Any]]:
                     cleaned_title = clean_heading_text(title)
                     
                     if cleaned_title and len(cleaned_title) > 1:
-                        outline.append({
-                            "level": heading_level,
-                            "text": cleaned_title,
-                            "page": max(1, int(page))
-                        })
+                        outline.append(Heading(heading_level, cleaned_title,
+                                               max(1, int(page))))
     except Exception:
         pass
     
     return outline
 
-@lru_cache(maxsize=2000)
+@lru_cache(maxsize=PREDICATE_CACHE_SIZE)
 def is_contact_info(text: str) -> bool:
     """Check if text contains contact information."""
-    text_lower = text.lower()
-    
-    # Phone numbers
-    if PATTERNS['phone'].search(text):
-        return True
-    
-    # URLs
-    if PATTERNS['url'].search(text_lower):
-        return True
-    
-    # Email patterns
-    if PATTERNS['email'].search(text):
-        return True
-    
-    # Address patterns
-    if PATTERNS['address'].search(text):
-        return True
-    
-    return False
+    return PATTERNS['contact'].search(text) is not None
 
 def extract_page_position(block: Dict[str, Any], page_height: float) -> float:
     """Extract relative position of block on page (0.0 = top, 1.0 = bottom)"""
@@ -242,47 +321,32 @@ def extract_page_position(block: Dict[str, Any], page_height: float) -> float:
         return 0.0
     return bbox[1] / max(page_height, 1)
 
-def validate_heading_hierarchy(outline: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
-    """Validate and fix heading hierarchy."""
-    if not outline:
-        return outline
-    
-    # Sort by page and original order
-    outline_sorted = sorted(outline, key=lambda x: (x['page'], x.get('order', 0)))
+def validate_heading_hierarchy(outline: List[Heading]) -> List[Heading]:
+    """Validate and fix heading hierarchy in place.
     
-    # Validate hierarchy
-    validated = []
+    The outline must already be in document order - extraction appends
+    headings page by page, so no re-sort is needed.
+    """
     last_level = 0
     
-    for heading in outline_sorted:
-        current_level = int(heading['level'][1])  # Extract number from H1, H2, H3
+    for i, heading in enumerate(outline):
+        current_level = int(heading.level[1])  # Extract number from H1, H2, H3
         
         # Ensure proper hierarchy - don't skip levels
         if current_level > last_level + 1:
             current_level = last_level + 1
-            heading['level'] = f"H{current_level}"
+            outline[i] = heading._replace(level=f"H{current_level}")
         
-        validated.append(heading)
         last_level = current_level
     
-    return validated
+    return outline
 
-def merge_similar_headings(headings: List[Dict[str, Any]], similarity_threshold: float = 0.8) -> List[Dict[str, Any]]:
+def merge_similar_headings(headings: List[Heading], similarity_threshold: float = 0.8) -> List[Heading]:
     """Merge similar headings to reduce duplicates"""
-    if not headings:
-        return headings
-    
-    merged = []
-    seen_text = set()
-    
+    # Order-preserving dedup keyed on the case-folded text (texts are
+    # already cleaned and stripped); the first occurrence wins
+    merged = {}
     for heading in headings:
-        text = heading['text'].lower().strip()
-        
-        # Simple duplicate check
-        if text in seen_text:
-            continue
-        
-        seen_text.add(text)
-        merged.append(heading)
+        merged.setdefault(heading.text.casefold(), heading)
     
-    return merged
+    return list(merged.values())